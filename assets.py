@@ -4,9 +4,51 @@ Do not place logic here. Only static string templates.
 """
 
 # --- HTML/CSS/JS Snippets ---
+HTML_SHELL = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script>
+var graphData = {payload};
+var network = new vis.Network(
+  document.getElementById('mynetwork'),
+  {{nodes: new vis.DataSet(graphData.nodes), edges: new vis.DataSet(graphData.edges)}},
+  graphData.options
+);
+// Registered in the same script as the constructor: stabilization runs in setTimeout
+// batches, so the event cannot fire before this listener exists
+window._stabilized = false;
+function markStabilized() {{
+  window._stabilized = true;
+  var minimalLoading = document.getElementById('minimalLoading');
+  if (minimalLoading && minimalLoading.parentNode) {{
+    minimalLoading.parentNode.removeChild(minimalLoading);
+  }}
+}}
+if (network.physics.options.enabled === false) {{
+  markStabilized();
+}} else {{
+  network.once('stabilizationIterationsDone', function() {{
+    network.stopSimulation();
+    markStabilized();
+  }});
+}}
+</script>
+</body>
+</html>
+'''
+
 PYVIS_OPTIONS = '''{
   "physics": {
-    "stabilization": true,
+    "stabilization": {
+      "enabled": true,
+      "iterations": 200
+    },
     "barnesHut": {
       "gravitationalConstant": -8000,
       "centralGravity": 0.1,
@@ -76,23 +118,14 @@ html, body {{ width: {width}px; height: {height}px; margin: 0; padding: 0; overf
 
 HTML_LOADING_JS = '''
 <script>
-var minimalLoading = document.getElementById('minimalLoading');
-if (minimalLoading) {
-  minimalLoading.innerText = '0%';
-  var interval = setInterval(function() {
-    if (window.network && window.network.body && window.network.body.nodeIndices && window.network.body.nodeIndices.length > 0) {
-      minimalLoading.innerText = '50%';
-      setTimeout(function() {
-        minimalLoading.innerText = '100%';
-        setTimeout(function() { 
-          if (minimalLoading && minimalLoading.parentNode) {
-            minimalLoading.parentNode.removeChild(minimalLoading);
-          }
-        }, 500);
-      }, 500);
-      clearInterval(interval);
+// The overlay is removed by markStabilized() in the page shell; this only shows progress
+if (window.network && !window._stabilized) {
+  window.network.on('stabilizationProgress', function(params) {
+    var minimalLoading = document.getElementById('minimalLoading');
+    if (minimalLoading) {
+      minimalLoading.innerText = Math.round(100 * params.iterations / params.total) + '%';
     }
-  }, 200);
+  });
 }
 </script>
 '''
@@ -101,9 +134,45 @@ HTML_ZOOM_JS = '''
 <script>
   window.addEventListener("load", function() {
     if (window.network) {
-      var pos = window.network.getViewPosition();
-      window.network.moveTo({scale: 2, position: pos});
+      if (window.network.physics.options.enabled === false) {
+        // No stabilization pass will refit the view, so show the whole precomputed layout
+        window.network.fit();
+      } else {
+        var pos = window.network.getViewPosition();
+        window.network.moveTo({scale: 2, position: pos});
+      }
     }
   });
 </script>
-''' 
\ No newline at end of file
+'''
+
+HTML_CLUSTER_JS = '''
+<script>
+  window.addEventListener("load", function() {
+    if (!window.network) {
+      return;
+    }
+    var groups = {};
+    window.network.body.data.nodes.forEach(function(node) {
+      if (node.group && node.group.indexOf('shared_for_') === 0) {
+        groups[node.group] = true;
+      }
+    });
+    Object.keys(groups).forEach(function(group) {
+      window.network.cluster({
+        joinCondition: function(nodeOptions) { return nodeOptions.group === group; },
+        processProperties: function(clusterOptions, childNodes) {
+          clusterOptions.title = childNodes.map(function(node) { return node.id; }).sort().join('\\n');
+          return clusterOptions;
+        },
+        clusterNodeProperties: {
+          id: 'cluster:' + group,
+          label: group.replace(/^shared_for_(.*)_level_(\\d+)$/, 'Shared for $1 (level $2)'),
+          shape: 'dot',
+          color: '#8e24aa'
+        }
+      });
+    });
+  });
+</script>
+'''
@@ -2,12 +2,18 @@
 config.py - Centralized configuration for Python Dependency Visualizer CLI
 """
 
-GRAPH_WIDTH_PX = 6000
-GRAPH_HEIGHT_PX = 2500
+GRAPH_WIDTH_PX = 2400
+GRAPH_HEIGHT_PX = 1600
 DEFAULT_OUTPUT_HTML = 'dependency_graph.html'
 DEFAULT_MAX_DEPTH = 1
-PDF_LOADING_SELECTOR = '#minimalLoading'
-PDF_LOADING_TIMEOUT_MS = 15000
+LARGE_GRAPH_NODE_THRESHOLD = 200
+LAYOUT_SEED = 42
+LEVEL_PALETTE = ['#1976d2', '#388e3c', '#fbc02d', '#e64a19', '#7b1fa2', '#00838f', '#c2185b']
 PDF_GRAPH_READY_TIMEOUT_MS = 20000
-PDF_PHYSICS_WAIT_MS = 2000
-REQUIREMENTS_FILE = 'requirements.txt' 
\ No newline at end of file
+PDF_CHROMIUM_ARGS = ['--disable-gpu', '--disable-dev-shm-usage']
+REQUIREMENTS_FILE = 'requirements.txt' 
+PYPI_TIMEOUT_S = 5
+PYPI_MAX_WORKERS = 32
+PYPI_POOL_SIZE = 64
+PYPI_CACHE_NAME = '.pypi_cache'
+PYPI_CACHE_EXPIRE_S = 86400
@@ -2,16 +2,23 @@
 core/graph_service.py - Service layer for dependency graph logic
 """
 import re
+import sys
+from collections import deque, defaultdict
 from typing import List
 from packaging.requirements import Requirement
 import networkx as nx
+from config import LEVEL_PALETTE
+
+# Plain `name[extras]<spec>` lines; anything with markers or URLs goes through packaging.Requirement
+_SIMPLE_REQ = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9_.\-]*)\s*(?:\[|[<>=!~;@\s]|$)')
 
 class DependencyGraphService:
     @staticmethod
     def parse_requirements(filename: str) -> List[str]:
         """
         Parse a requirements.txt file and return a list of package names (no versions/extras).
-        Handles all pip requirement formats using packaging.Requirement.
+        Simple lines are matched with a regex; markers and URLs fall back to packaging.Requirement.
+        Names are interned since they are reused as graph nodes, dict keys and set members.
         """
         packages = []
         with open(filename, 'r') as f:
@@ -19,47 +26,29 @@ class DependencyGraphService:
                 line = line.strip()
                 if not line or line.startswith('#'):
                     continue
+                m = _SIMPLE_REQ.match(line)
+                if m and ';' not in line and '@' not in line:
+                    packages.append(sys.intern(m.group(1)))
+                    continue
                 try:
                     req = Requirement(line)
-                    packages.append(req.name)
+                    packages.append(sys.intern(req.name))
                 except Exception:
                     continue  # skip lines that aren't valid requirements
         return packages
 
     @staticmethod
-    def filter_to_top_n_levels(G, roots, n):
-        """
-        Return a subgraph containing only nodes up to n levels deep from the given roots.
-        Uses BFS to collect nodes up to depth n.
-        For n==1, returns only the root nodes (no edges).
-        """
-        if n == 1:
-            return G.subgraph(roots).copy()
-        from collections import deque
-        visited = set()
-        queue = deque((root, 0) for root in roots)
-        while queue:
-            node, depth = queue.popleft()
-            if node in visited or depth > n:
-                continue
-            visited.add(node)
-            if depth < n:
-                for child in G.successors(node):
-                    queue.append((child, depth + 1))
-        return G.subgraph(visited).copy()
-
-    @staticmethod
-    def filter_to_top_n_levels_unique_colored(G, roots, n):
+    def _bfs_levels(G, roots, n):
         """
-        BFS from each root, tracking node levels and which root(s) each node is reachable from.
-        For each level > 1, only include nodes unique to a single root at that level.
-        Returns: (subgraph, node_levels, node_roots)
+        BFS from each root up to level n (roots are level 1), shared by all filter methods.
+        Returns: (node_levels, node_roots, root_level_nodes)
+        node_levels: node -> lowest level at which it is seen.
+        node_roots: node -> set of roots it is reachable from.
+        root_level_nodes: root -> level -> set(nodes).
         """
-        from collections import deque, defaultdict
         node_levels = {}
         node_roots = {}
-        visited = set()
-        all_nodes = set()
+        root_level_nodes = defaultdict(lambda: defaultdict(set))  # root -> level -> set(nodes)
         for root in roots:
             queue = deque([(root, 1)])
             local_visited = set()
@@ -68,15 +57,48 @@ class DependencyGraphService:
                 if level > n or (node, level) in local_visited:
                     continue
                 local_visited.add((node, level))
-                all_nodes.add(node)
-                # Track the lowest level at which this node is seen
-                if node not in node_levels or level < node_levels[node]:
-                    node_levels[node] = level
-                # Track which root(s) this node is reachable from
+                node_levels[node] = min(level, node_levels.get(node, level))
                 node_roots.setdefault(node, set()).add(root)
+                root_level_nodes[root][level].add(node)
                 if level < n:
                     for child in G.successors(node):
                         queue.append((child, level + 1))
+        return node_levels, node_roots, root_level_nodes
+
+    @staticmethod
+    def _annotate_levels(graph, node_levels, shared_nodes=()):
+        """
+        Store 'level' and its palette 'color' on every node of graph that has a level,
+        and flag shared_nodes with 'shared'. The HTML exporter reads these attributes directly.
+        """
+        for node, data in graph.nodes(data=True):
+            level = node_levels.get(node)
+            if level:
+                data['level'] = level
+                data['color'] = LEVEL_PALETTE[(level-1) % len(LEVEL_PALETTE)]
+        nx.set_node_attributes(graph, dict.fromkeys(shared_nodes, True), 'shared')
+
+    @staticmethod
+    def filter_to_top_n_levels(G, roots, n):
+        """
+        Return a read-only subgraph view containing only nodes up to n levels deep from the given roots.
+        For n==1, returns only the root nodes (no edges).
+        """
+        if n == 1:
+            return G.subgraph(roots)
+        # Depth here is counted from 0 at the roots, so n levels below them is n + 1 BFS levels
+        node_levels, _, _ = DependencyGraphService._bfs_levels(G, roots, n + 1)
+        return G.subgraph(node_levels)
+
+    @staticmethod
+    def filter_to_top_n_levels_unique_colored(G, roots, n):
+        """
+        Track node levels and which root(s) each node is reachable from.
+        For each level > 1, only include nodes unique to a single root at that level.
+        Returns: (subgraph, node_levels, node_roots); subgraph is a copy carrying 'level' and
+        'color' node attributes, so G itself is left untouched.
+        """
+        node_levels, node_roots, _ = DependencyGraphService._bfs_levels(G, roots, n)
         # For each level > 1, only keep nodes unique to a single root at that level
         filtered_nodes = set()
         for node, level in node_levels.items():
@@ -85,115 +107,57 @@ class DependencyGraphService:
             elif len(node_roots[node]) == 1:
                 filtered_nodes.add(node)
         subgraph = G.subgraph(filtered_nodes).copy()
+        DependencyGraphService._annotate_levels(subgraph, node_levels)
         return subgraph, node_levels, {k: list(v)[0] if len(v) == 1 else None for k, v in node_roots.items()}
 
     @staticmethod
     def filter_to_top_n_levels_with_shared_clusters(G, roots, n):
         """
-        For each root, at each level, cluster shared dependencies into a synthetic node per root.
+        For each root, at each level, tag shared dependencies with a cluster group per root.
+        Shared nodes are kept as real nodes with a "group" attribute of the form
+        "shared_for_<root>_level_<n>"; the browser collapses each group (see HTML_CLUSTER_JS).
+        A node shared by several roots joins the group of the first root/level that reaches it.
+        Roots are never grouped, so a root that is also another root's dependency stays visible.
         Returns: (subgraph, node_levels, node_roots, shared_clusters)
-        shared_clusters: dict of synthetic node -> list of shared dependencies for tooltip.
+        shared_clusters: dict of group name -> list of shared dependencies for tooltip.
         """
-        from collections import deque, defaultdict
-        node_levels = {}
-        node_roots = {}
-        visited = set()
-        all_nodes = set()
-        # For each root, track nodes at each level
-        root_level_nodes = defaultdict(lambda: defaultdict(set))  # root -> level -> set(nodes)
-        for root in roots:
-            queue = deque([(root, 1)])
-            local_visited = set()
-            while queue:
-                node, level = queue.popleft()
-                if level > n or (node, level) in local_visited:
-                    continue
-                local_visited.add((node, level))
-                all_nodes.add(node)
-                node_levels[node] = min(level, node_levels.get(node, level))
-                node_roots.setdefault(node, set()).add(root)
-                root_level_nodes[root][level].add(node)
-                if level < n:
-                    for child in G.successors(node):
-                        queue.append((child, level + 1))
-        # For each level > 1, cluster shared dependencies
-        filtered_nodes = set()
-        edges = set()
-        shared_clusters = {}
+        node_levels, node_roots, root_level_nodes = DependencyGraphService._bfs_levels(G, roots, n)
+        # For each level > 1, group shared dependencies
+        subgraph = nx.DiGraph()
+        subgraph.add_nodes_from(roots)
+        node_groups = {}
+        shared_clusters = defaultdict(list)
         for root in roots:
-            filtered_nodes.add(root)
             for level in range(2, n+1):
                 nodes = root_level_nodes[root][level]
-                unique = set()
-                shared = set()
+                subgraph.add_edges_from((root, node) for node in nodes)
                 for node in nodes:
-                    if len(node_roots[node]) == 1:
-                        unique.add(node)
-                    else:
-                        shared.add(node)
-                # Add unique nodes and edges
-                for node in unique:
-                    filtered_nodes.add(node)
-                    edges.add((root, node))
-                # Cluster shared nodes
-                if shared:
-                    cluster_name = f"Shared for {root} (level {level})"
-                    filtered_nodes.add(cluster_name)
-                    edges.add((root, cluster_name))
-                    shared_clusters[cluster_name] = sorted(shared)
-        # Build subgraph
-        subgraph = nx.DiGraph()
-        subgraph.add_nodes_from(filtered_nodes)
-        subgraph.add_edges_from(edges)
-        # Assign levels for synthetic nodes
-        for cluster in shared_clusters:
-            node_levels[cluster] = int(cluster.split('level ')[-1].rstrip(')'))
-        return subgraph, node_levels, node_roots, shared_clusters 
+                    if node_levels[node] > 1 and len(node_roots[node]) > 1 and node not in node_groups:
+                        node_groups[node] = f"shared_for_{root}_level_{level}"
+        for node, group in node_groups.items():
+            shared_clusters[group].append(node)
+        nx.set_node_attributes(subgraph, node_groups, 'group')
+        DependencyGraphService._annotate_levels(subgraph, node_levels)
+        return subgraph, node_levels, node_roots, {k: sorted(v) for k, v in shared_clusters.items()}
 
     @staticmethod
     def filter_to_top_n_levels_with_shared_nodes(G, roots, n):
         """
         For each root, at each level, show unique and shared dependencies as real nodes.
-        Shared dependencies are colored purple and have edges from all relevant roots.
+        Shared dependencies are flagged 'shared' (drawn larger) and have edges from all relevant roots.
         Returns: (subgraph, node_levels, node_roots, shared_nodes)
         shared_nodes: set of shared dependency node names.
         """
-        from collections import deque, defaultdict
-        node_levels = {}
-        node_roots = {}
-        visited = set()
-        all_nodes = set()
-        root_level_nodes = defaultdict(lambda: defaultdict(set))  # root -> level -> set(nodes)
-        for root in roots:
-            queue = deque([(root, 1)])
-            local_visited = set()
-            while queue:
-                node, level = queue.popleft()
-                if level > n or (node, level) in local_visited:
-                    continue
-                local_visited.add((node, level))
-                all_nodes.add(node)
-                node_levels[node] = min(level, node_levels.get(node, level))
-                node_roots.setdefault(node, set()).add(root)
-                root_level_nodes[root][level].add(node)
-                if level < n:
-                    for child in G.successors(node):
-                        queue.append((child, level + 1))
+        node_levels, node_roots, root_level_nodes = DependencyGraphService._bfs_levels(G, roots, n)
         # For each level > 1, add unique and shared nodes
-        filtered_nodes = set()
-        edges = set()
+        # Roots are added explicitly; every other node is an edge endpoint
+        subgraph = nx.DiGraph()
+        subgraph.add_nodes_from(roots)
         shared_nodes = set()
         for root in roots:
-            filtered_nodes.add(root)
             for level in range(2, n+1):
                 nodes = root_level_nodes[root][level]
-                for node in nodes:
-                    filtered_nodes.add(node)
-                    edges.add((root, node))
-                    if len(node_roots[node]) > 1:
-                        shared_nodes.add(node)
-        # Build subgraph
-        subgraph = nx.DiGraph()
-        subgraph.add_nodes_from(filtered_nodes)
-        subgraph.add_edges_from(edges)
-        return subgraph, node_levels, node_roots, shared_nodes 
\ No newline at end of file
+                subgraph.add_edges_from((root, node) for node in nodes)
+                shared_nodes.update(node for node in nodes if len(node_roots[node]) > 1)
+        DependencyGraphService._annotate_levels(subgraph, node_levels, shared_nodes)
+        return subgraph, node_levels, node_roots, shared_nodes
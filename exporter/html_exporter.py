@@ -1,96 +1,128 @@
 """
-html_exporter.py - HTML generation and post-processing for Python Dependency Visualizer CLI
+html_exporter.py - HTML generation for Python Dependency Visualizer CLI
 """
+import re
+import math
 from typing import Optional
 import networkx as nx
-from pyvis.network import Network
-from assets import PYVIS_OPTIONS, HTML_CSS, HTML_LOADING_JS, HTML_ZOOM_JS
+import orjson
+from config import GRAPH_WIDTH_PX, GRAPH_HEIGHT_PX, DEFAULT_OUTPUT_HTML, LARGE_GRAPH_NODE_THRESHOLD, LAYOUT_SEED
+from assets import PYVIS_OPTIONS, HTML_SHELL, HTML_CSS, HTML_LOADING_JS, HTML_ZOOM_JS, HTML_CLUSTER_JS
 
-# These should be imported from a config or main module in a larger project
-GRAPH_WIDTH_PX = 2400
-GRAPH_HEIGHT_PX = 1600
-DEFAULT_OUTPUT_HTML = 'dependency_graph.html'
+# The page size never changes at runtime, so format the CSS once
+_HTML_CSS_READY = HTML_CSS.format(width=GRAPH_WIDTH_PX, height=GRAPH_HEIGHT_PX)
+_HTML_INJECTIONS = {
+    # Insert CSS before </head>
+    '</head>': _HTML_CSS_READY + '</head>',
+    # Insert minimalist loading text as a new element after <body>
+    '<body>': '<body>\n<div id="minimalLoading">0%</div>',
+    # Inject loading, zoom and client-side clustering JS before </body>
+    '</body>': HTML_LOADING_JS + HTML_ZOOM_JS + HTML_CLUSTER_JS + '</body>',
+}
+_HTML_MARKERS = re.compile(r'</head>|<body>|</body>')
+# PYVIS_OPTIONS is static, so parse it once at import
+_OPTIONS_DICT = orjson.loads(PYVIS_OPTIONS)
+# Large graphs ship precomputed positions, so the browser runs no simulation
+_STATIC_OPTIONS_DICT = {**_OPTIONS_DICT, 'physics': {'enabled': False}}
+# Node attributes forwarded to vis.js; others (e.g. 'level', which vis.js reads as a
+# hierarchical-layout option, or the internal 'shared' flag) stay in Python
+_VIS_NODE_ATTRS = ('color', 'group')
 
 
-def postprocess_html(output_html: str) -> None:
-    """Inject custom CSS/JS and minimalist loading overlay into the generated HTML."""
-    with open(output_html, 'r', encoding='utf-8') as f:
-        html = f.read()
-    # Insert CSS after </head>
-    html = html.replace('</head>', HTML_CSS.format(width=GRAPH_WIDTH_PX, height=GRAPH_HEIGHT_PX) + '</head>')
-    # Insert minimalist loading text as a new element after <body>
-    html = html.replace('<body>', '<body>\n<div id="minimalLoading">0%</div>')
-    # Inject loading JS and zoom JS before </body>
-    html = html.replace('</body>', HTML_LOADING_JS + HTML_ZOOM_JS + '</body>')
-    with open(output_html, 'w', encoding='utf-8') as f:
-        f.write(html)
+def _inject(match: re.Match) -> str:
+    return _HTML_INJECTIONS[match.group(0)]
+
+
+# Everything but the graph payload is static, so the final page (shell, CSS, overlay and
+# scripts) is assembled once here and split around the payload slot
+_PAYLOAD_SLOT = '__GRAPH_PAYLOAD__'
+_HTML_PAGE_PREFIX, _HTML_PAGE_SUFFIX = _HTML_MARKERS.sub(
+    _inject, HTML_SHELL.format(payload=_PAYLOAD_SLOT)
+).split(_PAYLOAD_SLOT)
+
+
+def write_graph_html(nodes: list, edges: list, output_html: str, options: Optional[dict] = None) -> None:
+    """Write vis.js node/edge dicts and options as a single JSON payload into the prebuilt HTML page."""
+    payload = {
+        'nodes': nodes,
+        'edges': edges,
+        'options': _OPTIONS_DICT if options is None else options
+    }
+    # Escape "</" so the payload cannot terminate its <script> element
+    payload_js = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode('utf-8').replace('</', '<\\/')
+    with open(output_html, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(_HTML_PAGE_PREFIX)
+        f.write(payload_js)
+        f.write(_HTML_PAGE_SUFFIX)
+
+
+def write_static_graph_html(nodes: list, edges: list, positions: dict, output_html: str) -> None:
+    """
+    Write a physics-off page with every node pinned at positions ({node id: {'x', 'y'}}),
+    e.g. the settled layout read back from a live page via network.getPositions().
+    """
+    pinned = [
+        {**node, 'x': positions[node['id']]['x'], 'y': positions[node['id']]['y'], 'fixed': True}
+        if node['id'] in positions else node
+        for node in nodes
+    ]
+    write_graph_html(pinned, edges, output_html, _STATIC_OPTIONS_DICT)
 
 
 def visualize_graph(
     G: nx.DiGraph,
     output_html: str = DEFAULT_OUTPUT_HTML,
-    node_levels: dict = {},
     node_size: int = 16,
-    shared_nodes: set = None
+    roots: Optional[list] = None
 ) -> None:
-    """Render the dependency graph to HTML and post-process for UI/print quality. Optionally color nodes by level and show shared nodes in purple."""
-    from pyvis.network import Network
-    palette = ['#1976d2', '#388e3c', '#fbc02d', '#e64a19', '#7b1fa2', '#00838f', '#c2185b']
-    shared_color = '#8e24aa'
-    net = Network(
-        height=f'{GRAPH_HEIGHT_PX}px',
-        width=f'{GRAPH_WIDTH_PX}px',
-        directed=True,
-        notebook=False
-    )
-    if node_levels:
-        # Find root nodes (level 1)
-        roots = [node for node, lvl in node_levels.items() if lvl == 1]
-        n_roots = len(roots)
-        radius = 800
-        import math
-        root_positions = {}
+    """
+    Render the dependency graph to a self-contained HTML page for interactive use and PDF export.
+    The 'color' and 'group' node attributes set by DependencyGraphService are passed to vis.js;
+    nodes flagged 'shared' are drawn larger. Optional roots are pinned on a ring.
+    Graphs above LARGE_GRAPH_NODE_THRESHOLD nodes are laid out here and rendered with physics off.
+    """
+    # Roots go on a ring; unit radius here, scaled to pixels below
+    ring = {}
+    if roots:
         for i, node in enumerate(roots):
-            angle = 2 * math.pi * i / n_roots
-            x = radius * math.cos(angle)
-            y = radius * math.sin(angle)
-            root_positions[node] = (x, y)
-        for node in G.nodes:
-            level = node_levels.get(node, 0)
-            color = palette[(level-1) % len(palette)] if level > 0 else '#888'
-            if shared_nodes and node in shared_nodes:
-                size = node_size * 1.2
-                net.add_node(
-                    node,
-                    label=node,
-                    color=color,
-                    size=size,
-                    font={"size": node_size, "face": "Arial", "color": "#111", "bold": True}
-                )
-            elif node in root_positions:
-                x, y = root_positions[node]
-                net.add_node(
-                    node,
-                    label=node,
-                    color=color,
-                    size=node_size,
-                    x=x,
-                    y=y,
-                    fixed=True,
-                    font={"size": node_size, "face": "Arial", "color": "#111", "bold": True}
-                )
-            else:
-                net.add_node(
-                    node,
-                    label=node,
-                    color=color,
-                    size=node_size,
-                    font={"size": node_size, "face": "Arial", "color": "#111", "bold": True}
-                )
-        for source, target in G.edges:
-            net.add_edge(source, target)
+            angle = 2 * math.pi * i / len(roots)
+            ring[node] = (math.cos(angle), math.sin(angle))
+    options = None
+    if len(G) > LARGE_GRAPH_NODE_THRESHOLD:
+        # Seed the layout with the pinned ring so dependencies settle around their roots,
+        # then scale ring and layout together to fit the canvas. The undirected view makes
+        # edges attract both endpoints; on a DiGraph leaf dependencies would drift away.
+        pinned = {node: xy for node, xy in ring.items() if node in G}
+        layout = nx.spring_layout(
+            G.to_undirected(as_view=True),
+            pos=pinned or None,
+            fixed=list(pinned) or None,
+            seed=LAYOUT_SEED
+        )
+        extent_x = max(abs(float(x)) for x, _ in layout.values()) or 1.0
+        extent_y = max(abs(float(y)) for _, y in layout.values()) or 1.0
+        scale = min(GRAPH_WIDTH_PX / 2 / extent_x, GRAPH_HEIGHT_PX / 2 / extent_y)
+        options = _STATIC_OPTIONS_DICT
     else:
-        net.from_nx(G)
-    net.set_options(PYVIS_OPTIONS)
-    net.write_html(output_html)
-    postprocess_html(output_html) 
\ No newline at end of file
+        layout = ring
+        scale = 800
+    positions = {
+        node: {'x': float(x) * scale, 'y': float(y) * scale, 'fixed': True}
+        for node, (x, y) in layout.items()
+    }
+    font = {"size": node_size, "face": "Arial", "color": "#111", "bold": True}
+    nodes = []
+    for node, attrs in G.nodes(data=True):
+        entry = {
+            'id': node,
+            'label': str(node),
+            'size': node_size * 1.2 if attrs.get('shared') else node_size,
+            'font': font,
+            **positions.get(node, {})
+        }
+        for key in _VIS_NODE_ATTRS:
+            if key in attrs:
+                entry[key] = attrs[key]
+        nodes.append(entry)
+    edges = [{'from': source, 'to': target} for source, target in G.edges]
+    write_graph_html(nodes, edges, output_html, options)
@@ -3,48 +3,77 @@ pdf_exporter.py - PDF export for Python Dependency Visualizer CLI using Playwrig
 """
 import os
 import logging
-
-PDF_LOADING_SELECTOR = '#minimalLoading'
-PDF_LOADING_TIMEOUT_MS = 15000
-PDF_GRAPH_READY_TIMEOUT_MS = 20000
-PDF_PHYSICS_WAIT_MS = 2000
+import tempfile
+from config import PDF_GRAPH_READY_TIMEOUT_MS, PDF_CHROMIUM_ARGS
+from exporter.html_exporter import write_static_graph_html
 
 logger = logging.getLogger(__name__)
 
-def export_pdf_with_playwright(output_html: str, pdf_output: str) -> None:
+
+class PdfExporter:
     """
-    Export the HTML graph to a high-quality PDF using Playwright.
-    Waits for the graph to fully load and stabilize before exporting.
+    Keeps a single headless Chromium alive across several PDF exports.
+    Use as a context manager; each export runs in its own browser context.
     """
-    try:
+
+    def __init__(self):
+        self._pw = None
+        self._browser = None
+
+    def __enter__(self) -> 'PdfExporter':
         from playwright.sync_api import sync_playwright
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.goto(f'file://{os.path.abspath(output_html)}')
+        self._pw = sync_playwright().start()
+        try:
+            self._browser = self._pw.chromium.launch(args=PDF_CHROMIUM_ARGS)
+        except Exception:
+            self._pw.stop()
+            raise
+        return self
 
-            # Wait for the minimalist loading indicator to disappear
-            page.wait_for_selector(
-                PDF_LOADING_SELECTOR,
-                state='detached',
-                timeout=PDF_LOADING_TIMEOUT_MS
-            )
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        finally:
+            self._pw.stop()
+            self._browser = None
+            self._pw = None
 
-            # Wait for the graph to be fully rendered and stable
+    @staticmethod
+    def _wait_until_stable(page) -> None:
+        """Wait until the page shell reports a rendered, stabilized graph (it also drops the loading overlay)."""
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        try:
             page.wait_for_function(
-                '''() => {
-                    if (window.network && window.network.body) {
-                        const nodes = window.network.body.nodeIndices;
-                        const edges = window.network.body.edgeIndices;
-                        return nodes && nodes.length > 0 && edges && edges.length >= 0;
-                    }
-                    return false;
-                }''',
+                '''() => window._stabilized === true
+                    && window.network && window.network.body
+                    && window.network.body.nodeIndices.length > 0''',
                 timeout=PDF_GRAPH_READY_TIMEOUT_MS
             )
+        except PlaywrightTimeoutError:
+            logger.warning('Graph did not report stabilization in time; exporting current layout')
 
-            # Additional wait for physics stabilization
-            page.wait_for_timeout(PDF_PHYSICS_WAIT_MS)
+    def export(self, output_html: str, pdf_output: str) -> None:
+        """
+        Export the HTML graph to a high-quality PDF.
+        The live page is loaded until vis-network settles; the settled positions are then
+        read back and printed from a physics-off copy of the graph with every node pinned.
+        """
+        context = self._browser.new_context()
+        fd, static_html = tempfile.mkstemp(suffix='.html')
+        os.close(fd)
+        try:
+            page = context.new_page()
+            page.goto(f'file://{os.path.abspath(output_html)}')
+            self._wait_until_stable(page)
+
+            # Snapshot the settled layout and re-render it without any simulation
+            snapshot = page.evaluate(
+                '() => ({ nodes: graphData.nodes, edges: graphData.edges, positions: network.getPositions() })'
+            )
+            write_static_graph_html(snapshot['nodes'], snapshot['edges'], snapshot['positions'], static_html)
+            page.goto(f'file://{static_html}')
+            self._wait_until_stable(page)
 
             # Scroll the graph into view
             page.evaluate('''() => { document.getElementById('mynetwork').scrollIntoView(); }''')
@@ -61,9 +90,21 @@ def export_pdf_with_playwright(output_html: str, pdf_output: str) -> None:
                 },
                 prefer_css_page_size=True
             )
-            browser.close()
+        finally:
+            context.close()
+            os.remove(static_html)
         logger.info(f'Graph also exported to {pdf_output}')
+
+
+def export_pdf_with_playwright(output_html: str, pdf_output: str) -> None:
+    """
+    Export the HTML graph to a high-quality PDF using Playwright.
+    Launches a browser for this export only; use PdfExporter directly to export several files.
+    """
+    try:
+        with PdfExporter() as exporter:
+            exporter.export(output_html, pdf_output)
     except ImportError:
         logger.error('Playwright is not installed. Install it with: pip install playwright && playwright install')
     except Exception as e:
-        logger.error(f'PDF export failed: {e}') 
\ No newline at end of file
+        logger.error(f'PDF export failed: {e}')
@@ -3,94 +3,119 @@ import re
 import sys
 import logging
 import argparse
-from typing import List, Dict, Set, Optional
+from datetime import timedelta
+from functools import lru_cache
+from typing import List, Dict, Set, Optional, Tuple
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
-from pyvis.network import Network
-from assets import PYVIS_OPTIONS, HTML_CSS, HTML_LOADING_JS, HTML_ZOOM_JS
 from exporter.html_exporter import visualize_graph
 from exporter.pdf_exporter import export_pdf_with_playwright
 from core.graph_service import DependencyGraphService
-from config import DEFAULT_MAX_DEPTH
+from config import (
+    REQUIREMENTS_FILE, DEFAULT_OUTPUT_HTML, DEFAULT_MAX_DEPTH, PYPI_MAX_WORKERS, PYPI_POOL_SIZE, PYPI_TIMEOUT_S,
+    PYPI_CACHE_NAME, PYPI_CACHE_EXPIRE_S
+)
 from packaging.requirements import Requirement
 
-# --- Configuration Constants ---
-REQUIREMENTS_FILE = 'requirements.txt'
-DEFAULT_OUTPUT_HTML = 'dependency_graph.html'
-GRAPH_WIDTH_PX = 2400
-GRAPH_HEIGHT_PX = 1600
-
 # --- Logging Setup ---
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 logger = logging.getLogger(__name__)
 
 # --- PyPI Dependency Fetching ---
-def fetch_dependencies(
-    package: str,
-    seen: Optional[Set[str]] = None,
-    depth: int = 0,
-    max_depth: int = 2
-) -> Dict[str, List[str]]:
-    """Recursively fetch dependencies for a package from PyPI."""
-    if seen is None:
-        seen = set()
-    if package in seen or depth > max_depth:
-        return {}
-    seen.add(package)
+def _make_session() -> requests.Session:
+    """
+    Create a shared HTTP session with a keep-alive connection pool sized for the fetch workers.
+    PyPI responses (including 404s) are cached on disk when requests-cache is installed.
+    """
+    try:
+        from requests_cache import CachedSession
+        session = CachedSession(
+            PYPI_CACHE_NAME,
+            backend='sqlite',
+            expire_after=timedelta(seconds=PYPI_CACHE_EXPIRE_S),
+            allowable_codes=(200, 404)
+        )
+    except ImportError:
+        logger.info('requests-cache is not installed; PyPI responses will not be cached. Install it with: pip install requests-cache')
+        session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=PYPI_POOL_SIZE, pool_maxsize=PYPI_POOL_SIZE)
+    session.mount('https://', adapter)
+    return session
+
+SESSION = _make_session()
+
+@lru_cache(maxsize=None)
+def _fetch_requires(package: str) -> Optional[Tuple[str, ...]]:
+    """
+    Fetch the direct dependencies of a single package from PyPI.
+    Memoized per package name, independent of the depth it is reached at.
+    Returns None if PyPI does not know the package (404). Network errors and other
+    statuses raise, so only real 200/404 outcomes are memoized.
+    """
+    package = sys.intern(package)
     url = f'https://pypi.org/pypi/{package}/json'
+    resp = SESSION.get(url, timeout=PYPI_TIMEOUT_S)
+    if resp.status_code == 404:
+        logger.warning(f"PyPI returned status 404 for {package}")
+        return None
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"PyPI returned status {resp.status_code}", response=resp)
+    info = orjson.loads(resp.content)
+    requires_dist = info['info'].get('requires_dist') or []
+    deps = []
+    for dep in requires_dist:
+        try:
+            dep_req = Requirement(dep)
+            dep_name = sys.intern(dep_req.name)
+        except Exception:
+            dep_name = sys.intern(re.split(r'[ ;\(\)]', dep)[0])
+        if dep_name and dep_name.lower() != package.lower():
+            deps.append(dep_name)
+    # requires_dist repeats a name once per extra/marker combination
+    return tuple(dict.fromkeys(deps))
+
+def fetch_dependencies(package: str) -> Optional[Tuple[str, ...]]:
+    """
+    Return the direct dependencies of a package, or None if PyPI does not know it.
+    Transient failures are logged and treated as "no dependencies" for this call only.
+    """
     try:
-        resp = requests.get(url, timeout=5)
-        if resp.status_code != 200:
-            logger.warning(f"PyPI returned status {resp.status_code} for {package}")
-            return {}
-        info = resp.json()
-        requires_dist = info['info'].get('requires_dist') or []
-        deps = []
-        for dep in requires_dist:
-            try:
-                dep_req = Requirement(dep)
-                dep_name = dep_req.name
-            except Exception:
-                dep_name = re.split(r'[ ;\(\)]', dep)[0]
-            if dep_name and dep_name.lower() != package.lower():
-                deps.append(dep_name)
-        result = {package: deps}
-        for dep in deps:
-            result.update(fetch_dependencies(dep, seen, depth+1, max_depth))
-        return result
+        return _fetch_requires(package)
     except Exception as e:
         logger.warning(f"Failed to fetch dependencies for {package}: {e}")
-        return {package: []}
+        return ()
 
 # --- Graph Construction ---
 def build_dependency_graph(packages: List[str], max_depth: int = 2) -> nx.DiGraph:
-    """Build a directed dependency graph from a list of packages."""
+    """
+    Build a directed dependency graph from a list of packages.
+    Walks the tree breadth-first and fetches each level from PyPI in parallel.
+    BFS reaches every package at its shallowest depth; `seen` only limits expansion,
+    so edges into already-seen packages are still recorded.
+    """
     G = nx.DiGraph()
-    for pkg in packages:
-        dep_tree = fetch_dependencies(pkg, max_depth=max_depth)
-        for parent, children in dep_tree.items():
-            for child in children:
-                G.add_edge(parent, child)
-            if not children:
-                G.add_node(parent)
+    seen: Set[str] = set()
+    frontier = list(dict.fromkeys(packages))
+    depth = 0
+    with ThreadPoolExecutor(max_workers=PYPI_MAX_WORKERS) as executor:
+        while frontier and depth <= max_depth:
+            seen.update(frontier)
+            next_frontier: Dict[str, None] = {}
+            for package, deps in zip(frontier, executor.map(fetch_dependencies, frontier)):
+                if deps is None:
+                    continue
+                G.add_node(package)
+                for dep in deps:
+                    G.add_edge(package, dep)
+                    if dep not in seen:
+                        next_frontier[dep] = None
+            frontier = list(next_frontier)
+            depth += 1
     return G
 
-# --- Graph Layout ---
-def optimize_graph_layout(G: nx.DiGraph) -> None:
-    """Optimize node positions for better PDF rendering (in-place)."""
-    if len(G.nodes) == 0:
-        return
-    pos = nx.spring_layout(G, k=3, iterations=50)
-    x_coords = [pos[node][0] for node in G.nodes]
-    y_coords = [pos[node][1] for node in G.nodes]
-    if x_coords and y_coords:
-        x_range = max(x_coords) - min(x_coords)
-        y_range = max(y_coords) - min(y_coords)
-        scale_factor = min(GRAPH_WIDTH_PX / max(x_range, 1), GRAPH_HEIGHT_PX / max(y_range, 1))
-        for node in G.nodes:
-            pos[node] = (pos[node][0] * scale_factor, pos[node][1] * scale_factor)
-    # PyVis will use its own layout, but this helps for future extensibility
-
 # --- Main Entrypoint ---
 def main():
     parser = argparse.ArgumentParser(description='Python Dependency Visualizer')
@@ -112,10 +137,9 @@ def main():
 
     logger.info(f"Building dependency graph for {len(pkgs)} package(s)...")
     G = build_dependency_graph(pkgs, max_depth=args.depth)
-    optimize_graph_layout(G)
     if args.levels is not None:
-        G, node_levels, node_roots, shared_nodes = DependencyGraphService.filter_to_top_n_levels_with_shared_nodes(G, pkgs, args.levels)
-        visualize_graph(G, args.output, node_levels=node_levels, node_size=16, shared_nodes=shared_nodes)
+        G = DependencyGraphService.filter_to_top_n_levels_with_shared_nodes(G, pkgs, args.levels)[0]
+        visualize_graph(G, args.output, node_size=16, roots=pkgs)
     else:
         visualize_graph(G, args.output)
     if args.pdf: